@@ -1,5 +1,9 @@
 import os
-import google.generativeai as genai
+import asyncio
+import time
+from collections import OrderedDict
+import httpx
+from numba import njit
 from dotenv import load_dotenv
 import logging
 
@@ -7,79 +11,201 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Configure Gemini
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+_USE_GEMINI = bool(GEMINI_API_KEY)
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent"
 
-def get_gemini_advice(battery_temp: float, ambient_temp: float, device_state: str, 
-                     battery_level: int = 75, cpu_temp: float = None) -> dict:
+GEMINI_MAX_CONNECTIONS = 64
+
+# Long-lived HTTP/2 client so requests reuse pooled TLS connections
+_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_connections=GEMINI_MAX_CONNECTIONS, max_keepalive_connections=32),
+)
+
+# Queue callers here rather than inside the pool, where waiting counts against
+# the timeout and ends in a PoolTimeout
+_REQUEST_SLOTS = asyncio.Semaphore(GEMINI_MAX_CONNECTIONS)
+
+
+async def close_client():
+    """Close the pooled Gemini HTTP client"""
+    await _CLIENT.aclose()
+
+
+# Integer codes for device states, used by the compiled scoring kernel
+STATE_CODE = {"idle": 1, "discharging": 2, "charging": 3}
+STATE_CHARGING = STATE_CODE["charging"]
+
+# Alert levels and actions indexed by the code returned from _score
+ALERT_LEVELS = ("safe", "warning", "danger")
+ALERT_ACTIONS = (
+    None,
+    "Monitor temperature and reduce workload",
+    "Immediate cooling required - shut down intensive tasks",
+)
+
+
+@njit(cache=True)
+def _score(battery_temp, cpu_temp, device_state_code):
     """
-    Get advice from Gemini AI based on device conditions
+    Compute (alert_code, impact_score) from temperatures; cpu_temp of 0 means unknown
     """
-    try:
-        model = genai.GenerativeModel('gemini-pro')
-        
-        # Create a comprehensive prompt
-        prompt = f"""You are a battery health and device temperature expert. Analyze the following device conditions and provide advice:
+    if battery_temp > 45 or cpu_temp > 85:
+        alert_code = 2
+    elif battery_temp > 38 or cpu_temp > 70:
+        alert_code = 1
+    else:
+        alert_code = 0
 
-Device State: {device_state}
-Battery Temperature: {battery_temp}°C
-Ambient Temperature: {ambient_temp}°C
-Battery Level: {battery_level}%
-CPU Temperature: {cpu_temp}°C if cpu_temp else "Not available"
+    impact_score = 0.0
+    if battery_temp > 25:
+        impact_score += (battery_temp - 25) * 0.003
+    if device_state_code == STATE_CHARGING and battery_temp > 30:
+        impact_score += 0.02
+    if cpu_temp > 60:
+        impact_score += (cpu_temp - 60) * 0.001
 
-Provide:
-1. A brief assessment of the current thermal situation
-2. Specific recommendations to protect battery health
-3. Any immediate actions if temperatures are critical
+    return alert_code, min(impact_score, 0.15)  # Cap at 0.15
 
-Keep the response concise and practical. Focus on actionable advice."""
 
-        response = model.generate_content(prompt)
-        
-        # Parse the response and determine alert level
-        advice_text = response.text
+# Compile (or load from the on-disk cache) at import rather than on the first request
+_score(25.0, 50.0, 0)
+
+# In-process TTL + LRU cache of Gemini advice text, keyed on quantized inputs.
+# Each gunicorn worker keeps its own copy.
+ADVICE_CACHE_MAXSIZE = 2048
+ADVICE_CACHE_TTL = 300  # seconds
+_advice_cache = OrderedDict()
+
+
+def _advice_cache_key(battery_temp: float, ambient_temp: float, device_state: str,
+                      battery_level: int = None, cpu_temp: float = None) -> tuple:
+    """Bucket inputs so near-identical readings share one cached advice"""
+    return (
+        round(battery_temp),
+        round(ambient_temp),
+        device_state,
+        battery_level // 5 if battery_level is not None else -1,
+        round(cpu_temp) if cpu_temp is not None else -1,
+    )
+
+
+def _get_cached_advice(key: tuple):
+    entry = _advice_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, advice_text = entry
+    if time.monotonic() - stored_at > ADVICE_CACHE_TTL:
+        del _advice_cache[key]
+        return None
+    _advice_cache.move_to_end(key)
+    return advice_text
+
+
+def _store_cached_advice(key: tuple, advice_text: str):
+    _advice_cache[key] = (time.monotonic(), advice_text)
+    _advice_cache.move_to_end(key)
+    while len(_advice_cache) > ADVICE_CACHE_MAXSIZE:
+        _advice_cache.popitem(last=False)
+
+
+# Invariant parts of the advice prompt
+_PROMPT_HEAD = (
+    "You are a battery health and device temperature expert. "
+    "Analyze the following device conditions and provide advice:\n\n"
+)
+_PROMPT_TAIL = (
+    "\n\nProvide:\n"
+    "1. A brief assessment of the current thermal situation\n"
+    "2. Specific recommendations to protect battery health\n"
+    "3. Any immediate actions if temperatures are critical\n\n"
+    "Keep the response concise and practical. Focus on actionable advice."
+)
+
+
+async def _generate_advice_text(battery_temp: float, ambient_temp: float, device_state: str,
+                                battery_level: int = 75, cpu_temp: float = None) -> str:
+    """
+    Ask Gemini for natural language advice on the given device conditions
+    """
+    # Only the device conditions change between calls
+    cpu_line = f"{cpu_temp}°C" if cpu_temp is not None else "Not available"
+    prompt = "".join((
+        _PROMPT_HEAD,
+        f"Device State: {device_state}\n"
+        f"Battery Temperature: {battery_temp}°C\n"
+        f"Ambient Temperature: {ambient_temp}°C\n"
+        f"Battery Level: {battery_level}%\n"
+        f"CPU Temperature: {cpu_line}",
+        _PROMPT_TAIL,
+    ))
+
+    async with _REQUEST_SLOTS:
+        response = await _CLIENT.post(
+            GEMINI_URL,
+            headers={"x-goog-api-key": GEMINI_API_KEY},
+            json={"contents": [{"parts": [{"text": prompt}]}]},
+        )
+    response.raise_for_status()
+    
+    return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+
+
+# Fallback advice when Gemini is unavailable
+_FALLBACK_DANGER = {
+    "natural_language_tip": "⚠️ High battery temperature detected. Please close intensive applications and allow your device to cool down. Avoid charging until temperature normalizes.",
+    "alert_level": "danger",
+    "optional_action": "Stop charging and close heavy applications",
+    "predicted_health_impact": 0.1
+}
+_FALLBACK_SAFE = {
+    "natural_language_tip": "✅ Your device temperature is within normal range. Continue regular usage while monitoring for any changes.",
+    "alert_level": "safe",
+    "optional_action": None,
+    "predicted_health_impact": 0.02
+}
+
+def _fallback_advice(battery_temp: float) -> dict:
+    return _FALLBACK_DANGER if battery_temp > 40 else _FALLBACK_SAFE
+
+
+async def _offline_advice(battery_temp: float, ambient_temp: float, device_state: str,
+                          battery_level: int = 75, cpu_temp: float = None) -> dict:
+    """
+    Get advice without an API key, skipping the Gemini request entirely
+    """
+    return _fallback_advice(battery_temp)
+
+
+async def _gemini_advice(battery_temp: float, ambient_temp: float, device_state: str,
+                         battery_level: int = 75, cpu_temp: float = None) -> dict:
+    """
+    Get advice from Gemini AI based on device conditions
+    """
+    try:
+        cache_key = _advice_cache_key(battery_temp, ambient_temp, device_state, battery_level, cpu_temp)
+        advice_text = _get_cached_advice(cache_key)
+        if advice_text is None:
+            advice_text = await _generate_advice_text(battery_temp, ambient_temp, device_state,
+                                                      battery_level, cpu_temp)
+            _store_cached_advice(cache_key, advice_text)
         
-        # Determine alert level based on temperatures
-        if battery_temp > 45 or (cpu_temp and cpu_temp > 85):
-            alert_level = "danger"
-            optional_action = "Immediate cooling required - shut down intensive tasks"
-        elif battery_temp > 38 or (cpu_temp and cpu_temp > 70):
-            alert_level = "warning"
-            optional_action = "Monitor temperature and reduce workload"
-        else:
-            alert_level = "safe"
-            optional_action = None
+        alert_code, impact_score = _score(float(battery_temp), float(cpu_temp or 0.0),
+                                          STATE_CODE.get(device_state, 0))
         
-        # Calculate a simple health impact score
-        impact_score = 0.0
-        if battery_temp > 25:
-            impact_score += (battery_temp - 25) * 0.003
-        if device_state == "charging" and battery_temp > 30:
-            impact_score += 0.02
-        if cpu_temp and cpu_temp > 60:
-            impact_score += (cpu_temp - 60) * 0.001
-            
         return {
             "natural_language_tip": advice_text,
-            "alert_level": alert_level,
-            "optional_action": optional_action,
-            "predicted_health_impact": min(impact_score, 0.15)  # Cap at 0.15
+            "alert_level": ALERT_LEVELS[alert_code],
+            "optional_action": ALERT_ACTIONS[alert_code],
+            "predicted_health_impact": impact_score
         }
         
     except Exception as e:
         logger.error(f"Gemini API error: {str(e)}")
-        
-        # Fallback advice
-        if battery_temp > 40:
-            return {
-                "natural_language_tip": "⚠️ High battery temperature detected. Please close intensive applications and allow your device to cool down. Avoid charging until temperature normalizes.",
-                "alert_level": "danger",
-                "optional_action": "Stop charging and close heavy applications",
-                "predicted_health_impact": 0.1
-            }
-        else:
-            return {
-                "natural_language_tip": "✅ Your device temperature is within normal range. Continue regular usage while monitoring for any changes.",
-                "alert_level": "safe",
-                "optional_action": None,
-                "predicted_health_impact": 0.02
-            }
\ No newline at end of file
+        return _fallback_advice(battery_temp)
+
+
+# Without an API key every Gemini call would fail, so skip straight to the fallback
+get_gemini_advice = _gemini_advice if _USE_GEMINI else _offline_advice
@@ -1,17 +1,26 @@
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import joblib
+import json
+import onnxruntime as ort
 import os
-from typing import Optional
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
 
 from train_model import train_and_save
-from gemini_advisor import get_gemini_advice
+from gemini_advisor import get_gemini_advice, close_client, GEMINI_MAX_CONNECTIONS
 from sensor_reader import SensorReader
 from advisory_history import AdvisoryHistory
 
-app = FastAPI(title="ThermoSense ML + Gemini Advisory")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="ThermoSense ML + Gemini Advisory", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -22,24 +31,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-MODEL_PATH = "model.pkl"
 ENCODER_PATH = "encoder.pkl"
-COLUMN_PATH = "columns.pkl"
+COLUMN_PATH = "columns.json"
+ONNX_PATH = "model.onnx"
+HISTORY_FLUSH_INTERVAL = 0.1  # seconds
+HISTORY_READ_TIMEOUT = 1.0  # seconds a history read waits for pending writes
+# One Gemini request per item, so keep a batch within the HTTP connection pool
+MAX_BATCH_SIZE = GEMINI_MAX_CONNECTIONS
 
 # Initialize components
 sensor_reader = SensorReader()
 advisory_history = AdvisoryHistory()
+history_queue = asyncio.Queue()
+_HISTORY_STOP = object()  # queued on shutdown to stop the history writer
+# Entries are saved in queue order, so comparing these counts tells a reader
+# whether everything queued before it has been written
+history_queued = 0
+history_saved = 0
+history_saved_cond = asyncio.Condition()
 
-# Check if model, encoder, and column list exist
-if not (os.path.exists(MODEL_PATH) and os.path.exists(ENCODER_PATH) and os.path.exists(COLUMN_PATH)):
+# Check if the ONNX model, encoder, and column list exist
+if not all(os.path.exists(p) for p in (ONNX_PATH, ENCODER_PATH, COLUMN_PATH)):
     print("Model, encoder, or column file not found. Training...")
     train_and_save()
 
-# Load model and encoder
-model = joblib.load(MODEL_PATH)
+# Load model, encoder, and column list once, in the gunicorn parent when preloaded.
+# ONNX Runtime sessions are not fork-safe, so only the model bytes are loaded here
+# and each worker builds its own session on startup.
+with open(ONNX_PATH, "rb") as f:
+    onnx_model = f.read()
+sess = None
+# The encoder is only used at startup to precompute the one-hot lookup below
 encoder = joblib.load(ENCODER_PATH)
+with open(COLUMN_PATH) as f:
+    columns = json.load(f)
 print("Model and encoder loaded.")
 
+# Precompute feature positions so a prediction row can be filled in directly
+COL_INDEX = {c: i for i, c in enumerate(columns)}
+ONEHOT_COLS = np.array([COL_INDEX[c] for c in encoder.get_feature_names_out(["device_state"])])
+
+# Encode every known device state once instead of calling encoder.transform per request
+_known_states = list(encoder.categories_[0])
+STATE_TO_ONEHOT = dict(zip(
+    _known_states,
+    encoder.transform(pd.DataFrame({"device_state": _known_states})).astype(np.float32),
+))
+UNKNOWN_ONEHOT = np.zeros(len(ONEHOT_COLS), dtype=np.float32)
+
 
 # ========== Pydantic Models ==========
 class SensorInput(BaseModel):
@@ -50,6 +89,17 @@ class SensorInput(BaseModel):
     cpu_temp: Optional[float] = None
 
 
+class AdviceOut(BaseModel):
+    predicted_health_impact: float
+    alert_level: str
+    natural_language_tip: str
+    optional_action: Optional[str] = None
+
+
+class AdviceBatchOut(BaseModel):
+    results: List[AdviceOut]
+
+
 # ========== Helper Functions ==========
 def get_alert_level(impact):
     if impact > 0.07:
@@ -60,6 +110,108 @@ def get_alert_level(impact):
         return "safe"
 
 
+def build_feature_row(input):
+    """Build the single-row model input without going through pandas"""
+    X = np.zeros((1, len(columns)), dtype=np.float32)
+    X[0, COL_INDEX["battery_temp"]] = input.battery_temp
+    X[0, COL_INDEX["ambient_temp"]] = input.ambient_temp
+    # Unknown states leave every one-hot column at zero
+    X[0, ONEHOT_COLS] = STATE_TO_ONEHOT.get(input.device_state, UNKNOWN_ONEHOT)
+    return X
+
+
+def create_session():
+    """Build a single-threaded ONNX session; one-row predictions gain nothing from a
+    thread pool, and each worker would otherwise start one thread per core"""
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return ort.InferenceSession(onnx_model, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def predict_impact(X):
+    """Run the ONNX model on a prepared row and return the scalar prediction"""
+    return sess.run(None, {"X": X})[0][0, 0]
+
+
+def queue_history(entry):
+    global history_queued
+    history_queued += 1
+    history_queue.put_nowait(entry)
+
+
+async def save_history_batch(batch):
+    global history_saved
+    for entry in batch:
+        try:
+            await advisory_history.add_advisory(entry)
+        except Exception as e:
+            logger.error(f"Failed to save advisory history: {e}")
+    async with history_saved_cond:
+        history_saved += len(batch)
+        history_saved_cond.notify_all()
+
+
+async def wait_for_history():
+    """Wait, for at most HISTORY_READ_TIMEOUT, until entries queued before this call are saved"""
+    target = history_queued
+    
+    async def saved():
+        async with history_saved_cond:
+            await history_saved_cond.wait_for(lambda: history_saved >= target)
+    
+    try:
+        await asyncio.wait_for(saved(), HISTORY_READ_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Timed out waiting for queued history writes, reading saved entries only")
+
+
+async def history_writer():
+    """Persist queued advisory entries in batches, off the request path"""
+    while True:
+        batch = [await history_queue.get()]
+        while not history_queue.empty():
+            batch.append(history_queue.get_nowait())
+        await save_history_batch([entry for entry in batch if entry is not _HISTORY_STOP])
+        if _HISTORY_STOP in batch:
+            return
+        await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+
+
+# ========== Lifecycle ==========
+@app.on_event("startup")
+async def startup():
+    global sess
+    sess = create_session()
+    # Connect to WMI from inside this worker process
+    sensor_reader.start()
+    app.state.history_task = asyncio.create_task(history_writer())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    try:
+        # Let the writer finish its current batch and everything queued before the stop marker
+        history_task = getattr(app.state, "history_task", None)
+        if history_task is not None:
+            history_queue.put_nowait(_HISTORY_STOP)
+            await history_task
+    except Exception as e:
+        logger.error(f"History writer failed: {e}")
+    finally:
+        try:
+            # Save anything the writer did not get to
+            batch = []
+            while not history_queue.empty():
+                entry = history_queue.get_nowait()
+                if entry is not _HISTORY_STOP:
+                    batch.append(entry)
+            await save_history_batch(batch)
+        finally:
+            await close_client()
+
+
 # ========== API Endpoints ==========
 @app.get("/")
 def home():
@@ -70,65 +222,69 @@ def home():
 async def get_sensor_data():
     """Get real-time sensor data from the system"""
     try:
-        battery_info = sensor_reader.get_battery_info()
-        temp_info = sensor_reader.get_temperature_info()
-        system_info = sensor_reader.get_system_info()
+        # WMI calls block, so keep them off the event loop
+        battery_info = await sensor_reader.run(sensor_reader.get_battery_info)
+        temp_info = await sensor_reader.run(sensor_reader.get_temperature_info)
+        system_info = await sensor_reader.run(sensor_reader.get_system_info)
         
         return {
             "battery": battery_info,
             "temperature": temp_info,
             "system": system_info,
-            "timestamp": pd.Timestamp.now().isoformat()
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/advice")
-async def get_advice(input: SensorInput):
-    try:
-        # Get ML model prediction
-        columns = joblib.load(COLUMN_PATH)
-        
-        input_df = pd.DataFrame([{
-            "battery_temp": input.battery_temp,
-            "ambient_temp": input.ambient_temp,
-            "device_state": input.device_state
-        }])
-        
-        encoded_state = encoder.transform(input_df[["device_state"]])
-        encoded_df = pd.DataFrame(encoded_state, columns=encoder.get_feature_names_out(["device_state"]))
-        X_live = pd.concat([input_df[["battery_temp", "ambient_temp"]].reset_index(drop=True), encoded_df], axis=1)
-        X_live = X_live.reindex(columns=columns, fill_value=0)
-        
-        impact = model.predict(X_live)[0]
-        
-        # Get Gemini advice
-        gemini_response = get_gemini_advice(
+async def build_advice(input: SensorInput):
+    """Run the ML prediction and Gemini advisory for a single input"""
+    X_live = build_feature_row(input)
+    
+    # The ML prediction and Gemini advice are independent, so run them concurrently
+    impact, gemini_response = await asyncio.gather(
+        asyncio.to_thread(predict_impact, X_live),
+        get_gemini_advice(
             battery_temp=input.battery_temp,
             ambient_temp=input.ambient_temp,
             device_state=input.device_state,
             battery_level=input.battery_level,
             cpu_temp=input.cpu_temp
-        )
-        
-        # Combine ML prediction with Gemini advice
-        response = {
-            "predicted_health_impact": round(float(impact), 5),
-            "alert_level": gemini_response["alert_level"],
-            "natural_language_tip": gemini_response["natural_language_tip"],
-            "optional_action": gemini_response["optional_action"],
-        }
-        
-        # Save to history
-        history_entry = {
-            **input.dict(),
-            **response
-        }
-        await advisory_history.add_advisory(history_entry)
-        
-        return response
-        
+        ),
+    )
+    
+    # Combine ML prediction with Gemini advice
+    response = {
+        "predicted_health_impact": round(float(impact), 5),
+        "alert_level": gemini_response["alert_level"],
+        "natural_language_tip": gemini_response["natural_language_tip"],
+        "optional_action": gemini_response["optional_action"],
+    }
+    
+    # Save to history
+    history_entry = {
+        **input.model_dump(),
+        **response
+    }
+    queue_history(history_entry)
+    
+    return response
+
+
+@app.post("/api/advice", response_model=AdviceOut)
+async def get_advice(input: SensorInput):
+    try:
+        return await build_advice(input)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/advice/batch", response_model=AdviceBatchOut)
+async def get_advice_batch(inputs: conlist(SensorInput, min_length=1, max_length=MAX_BATCH_SIZE)):
+    """Get advice for several inputs, dispatching the Gemini calls concurrently"""
+    try:
+        responses = await asyncio.gather(*[build_advice(s) for s in inputs])
+        return {"results": responses}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -137,6 +293,8 @@ async def get_advice(input: SensorInput):
 async def get_advisory_history(limit: int = 50):
     """Get advisory history"""
     try:
+        # Wait briefly for queued writes so a client sees the advice it just requested
+        await wait_for_history()
         history = await advisory_history.get_history(limit=limit)
         return {"history": history}
     except Exception as e:
@@ -147,6 +305,7 @@ async def get_advisory_history(limit: int = 50):
 async def get_advisory_statistics():
     """Get advisory statistics"""
     try:
+        await wait_for_history()
         stats = await advisory_history.get_statistics()
         return stats
     except Exception as e:
@@ -1,33 +1,170 @@
 import wmi
+import psutil
 import platform
 import logging
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Dashboards poll faster than sensor values change
+SENSOR_CACHE_TTL = 1.0  # seconds
+
+TEMPERATURE_SENSOR_QUERY = "SELECT Name, Value FROM Sensor WHERE SensorType='Temperature'"
+
+# Steady-state defaults returned when no real sensor data is available
+_FALLBACK_BATTERY = {
+    "level": 75,
+    "status": "Unknown",
+    "charging": False,
+    "voltage": None,
+    "source": "simulated"
+}
+
+_FALLBACK_TEMPERATURE = {
+    "cpu": 35.0,
+    "battery": 35.0 * 0.8,
+    "system": 35.0 * 0.7,
+    "source": "simulated"
+}
+
+_FALLBACK_SYSTEM = {
+    "cpu_usage": 25,
+    "memory": {
+        "total": 8192,
+        "used": 4096,
+        "free": 4096
+    },
+    "source": "simulated"
+}
+
 class SensorReader:
     def __init__(self):
         self.is_windows = platform.system() == 'Windows'
         self.wmi_client = None
+        self._c = None
+        self._acpi_client = None
+        self._battery_voltage = None
+        self._cache = {}
         
-        if self.is_windows:
-            try:
-                self.wmi_client = wmi.WMI(namespace="root\\OpenHardwareMonitor")
-            except Exception as e:
-                logger.warning(f"OpenHardwareMonitor WMI not available: {e}")
-                try:
-                    self.wmi_client = wmi.WMI(namespace="root\\WMI")
-                except Exception as e2:
-                    logger.error(f"WMI initialization failed: {e2}")
+        # COM objects are bound to the thread that created them, so every WMI
+        # call runs on one dedicated thread which also owns the connections
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="wmi",
+            initializer=self._connect if self.is_windows else None,
+        )
+        
+        # The first cpu_percent(interval=None) call only sets the baseline
+        psutil.cpu_percent(interval=None)
+    
+    def _connect(self):
+        """Initialize COM and the WMI clients on the sensor thread"""
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+        except Exception as e:
+            logger.warning(f"COM initialization failed: {e}")
+        
+        try:
+            self._c = wmi.WMI()
+        except Exception as e:
+            logger.error(f"WMI initialization failed: {e}")
+        
+        # Design voltage is static, so read it once instead of on every battery poll
+        self._battery_voltage = self._read_battery_voltage()
+        
+        try:
+            self.wmi_client = wmi.WMI(namespace="root\\OpenHardwareMonitor")
+        except Exception as e:
+            logger.warning(f"OpenHardwareMonitor WMI not available: {e}")
+        
+        # ACPI thermal zones, used when OpenHardwareMonitor is missing or fails
+        try:
+            self._acpi_client = wmi.WMI(namespace="root\\WMI")
+        except Exception as e:
+            logger.error(f"WMI initialization failed: {e}")
+    
+    def start(self):
+        """Spin up the sensor thread, which connects to WMI in the current process"""
+        self._executor.submit(lambda: None)
+    
+    async def run(self, getter):
+        """Run a sensor getter on the WMI thread without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, getter)
+    
+    def _cached(self, key, read):
+        """Return the last reading for key if it is fresher than SENSOR_CACHE_TTL"""
+        entry = self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < SENSOR_CACHE_TTL:
+            return entry[1]
+        value = read()
+        self._cache[key] = (now, value)
+        return value
     
     def get_battery_info(self):
         """Get battery information using WMI"""
-        if not self.is_windows:
+        return self._cached("battery", self._read_battery_info)
+    
+    def get_temperature_info(self):
+        """Get temperature information using WMI"""
+        return self._cached("temperature", self._read_temperature_info)
+    
+    def get_system_info(self):
+        """Get system performance information"""
+        return self._cached("system", self._read_system_info)
+    
+    def _read_battery_info(self):
+        try:
+            # psutil reads the battery through native APIs, no COM round trips
+            battery = psutil.sensors_battery()
+        except Exception as e:
+            logger.error(f"Error reading battery info: {e}")
+            battery = None
+        
+        if battery is None:
+            return self._read_wmi_battery_info()
+        
+        charging = bool(battery.power_plugged) and battery.percent < 100
+        if charging:
+            status = "Charging"
+        elif battery.power_plugged:
+            status = "Fully Charged"
+        else:
+            status = "Discharging"
+        
+        return {
+            "level": round(battery.percent),
+            "status": status,
+            "charging": charging,
+            "voltage": self._battery_voltage,
+            "source": "psutil"
+        }
+    
+    def _read_battery_voltage(self):
+        """Design voltage is only exposed through WMI"""
+        if not self.is_windows or not self._c:
+            return None
+        
+        try:
+            batteries = self._c.query("SELECT DesignVoltage FROM Win32_Battery")
+            if batteries:
+                return batteries[0].DesignVoltage
+        except Exception as e:
+            logger.warning(f"Error reading battery voltage: {e}")
+        
+        return None
+    
+    def _read_wmi_battery_info(self):
+        if not self.is_windows or not self._c:
             return self._get_fallback_battery_info()
         
         try:
             # Try Win32_Battery for basic battery info
-            c = wmi.WMI()
-            batteries = c.Win32_Battery()
+            batteries = self._c.Win32_Battery()
             
             if batteries:
                 battery = batteries[0]
@@ -43,8 +180,7 @@ class SensorReader:
         
         return self._get_fallback_battery_info()
     
-    def get_temperature_info(self):
-        """Get temperature information using WMI"""
+    def _read_temperature_info(self):
         temperatures = {
             "cpu": None,
             "battery": None,
@@ -52,15 +188,15 @@ class SensorReader:
             "source": "fallback"
         }
         
-        if not self.is_windows or not self.wmi_client:
+        if not self.is_windows or not (self.wmi_client or self._acpi_client):
             return self._get_fallback_temperature_info()
         
-        try:
-            # Try OpenHardwareMonitor first
-            sensors = self.wmi_client.Sensor()
-            
-            for sensor in sensors:
-                if sensor.SensorType == "Temperature":
+        if self.wmi_client:
+            try:
+                # Try OpenHardwareMonitor first, fetching only temperature sensors
+                sensors = self.wmi_client.query(TEMPERATURE_SENSOR_QUERY)
+                
+                for sensor in sensors:
                     name = sensor.Name.lower()
                     value = sensor.Value
                     
@@ -70,16 +206,16 @@ class SensorReader:
                         temperatures["battery"] = value
                     elif "system" in name and temperatures["system"] is None:
                         temperatures["system"] = value
-            
-            temperatures["source"] = "OpenHardwareMonitor"
-            
-        except Exception as e:
-            logger.warning(f"OpenHardwareMonitor read failed: {e}")
-            
+                
+                temperatures["source"] = "OpenHardwareMonitor"
+                
+            except Exception as e:
+                logger.warning(f"OpenHardwareMonitor read failed: {e}")
+        
+        if temperatures["source"] != "OpenHardwareMonitor" and self._acpi_client:
             # Try MSAcpi_ThermalZoneTemperature
             try:
-                c = wmi.WMI(namespace="root\\WMI")
-                temp_sensors = c.MSAcpi_ThermalZoneTemperature()
+                temp_sensors = self._acpi_client.MSAcpi_ThermalZoneTemperature()
                 
                 if temp_sensors:
                     # Convert from tenths of Kelvin to Celsius
@@ -88,8 +224,8 @@ class SensorReader:
                     temperatures["system"] = celsius_temp
                     temperatures["source"] = "MSAcpi"
                     
-            except Exception as e2:
-                logger.error(f"MSAcpi temperature read failed: {e2}")
+            except Exception as e:
+                logger.error(f"MSAcpi temperature read failed: {e}")
         
         # Fill in missing values with estimates
         if temperatures["cpu"] is None:
@@ -101,22 +237,15 @@ class SensorReader:
             
         return temperatures
     
-    def get_system_info(self):
-        """Get system performance information"""
-        if not self.is_windows:
-            return self._get_fallback_system_info()
-        
+    def _read_system_info(self):
         try:
-            c = wmi.WMI()
-            
-            # CPU usage
-            cpu_info = c.Win32_Processor()[0]
-            cpu_usage = cpu_info.LoadPercentage or 25
+            # CPU usage since the previous call
+            cpu_usage = psutil.cpu_percent(interval=None) or 25
             
             # Memory info
-            os_info = c.Win32_OperatingSystem()[0]
-            total_memory = int(os_info.TotalVisibleMemorySize) // 1024  # Convert to MB
-            free_memory = int(os_info.FreePhysicalMemory) // 1024
+            memory = psutil.virtual_memory()
+            total_memory = memory.total // (1024 * 1024)  # Convert to MB
+            free_memory = memory.available // (1024 * 1024)
             used_memory = total_memory - free_memory
             
             return {
@@ -126,7 +255,7 @@ class SensorReader:
                     "used": used_memory,
                     "free": free_memory
                 },
-                "source": "WMI"
+                "source": "psutil"
             }
             
         except Exception as e:
@@ -152,35 +281,12 @@ class SensorReader:
     
     def _get_fallback_battery_info(self):
         """Fallback battery information when WMI is not available"""
-        import random
-        return {
-            "level": random.randint(70, 95),
-            "status": "Unknown",
-            "charging": random.choice([True, False]),
-            "voltage": None,
-            "source": "simulated"
-        }
+        return _FALLBACK_BATTERY
     
     def _get_fallback_temperature_info(self):
         """Fallback temperature information"""
-        import random
-        base_temp = 35 + random.uniform(-5, 10)
-        return {
-            "cpu": base_temp,
-            "battery": base_temp * 0.8,
-            "system": base_temp * 0.7,
-            "source": "simulated"
-        }
+        return _FALLBACK_TEMPERATURE
     
     def _get_fallback_system_info(self):
         """Fallback system information"""
-        import random
-        return {
-            "cpu_usage": random.randint(15, 45),
-            "memory": {
-                "total": 8192,
-                "used": random.randint(3000, 6000),
-                "free": 8192 - random.randint(3000, 6000)
-            },
-            "source": "simulated"
-        }
\ No newline at end of file
+        return _FALLBACK_SYSTEM
\ No newline at end of file
@@ -1,12 +1,19 @@
 import pandas as pd
+import numpy as np
+import onnxruntime as ort
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder
 import joblib
+import json
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
 
+# The sklearn pickle is kept as the training artifact; the API serves model.onnx
 MODEL_PATH = 'model.pkl'
 ENCODER_PATH = 'encoder.pkl'
-COLUMN_PATH = 'columns.pkl'
+COLUMN_PATH = 'columns.json'
+ONNX_PATH = 'model.onnx'
 DATA_PATH = 'thermosense_test_data.csv'
 
 def train_and_save():
@@ -29,7 +36,20 @@ def train_and_save():
 
     joblib.dump(model, MODEL_PATH)
     joblib.dump(encoder, ENCODER_PATH)
-    joblib.dump(X.columns.tolist(), COLUMN_PATH)
+    with open(COLUMN_PATH, 'w') as f:
+        json.dump(X.columns.tolist(), f)
+
+    # Export to ONNX for fast single-row inference in the API
+    onnx_model = convert_sklearn(model, initial_types=[('X', FloatTensorType([None, X.shape[1]]))])
+    with open(ONNX_PATH, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+
+    # Check the exported graph reproduces sklearn on the float32 rows the API sends
+    sess = ort.InferenceSession(onnx_model.SerializeToString(), providers=['CPUExecutionProvider'])
+    X_check = X_train[:100]
+    onnx_pred = sess.run(None, {'X': X_check.to_numpy(dtype=np.float32)})[0].ravel()
+    if not np.allclose(onnx_pred, model.predict(X_check), atol=1e-5):
+        raise ValueError("ONNX export does not match sklearn predictions")
     
     print("Model and encoder trained and saved.")
 